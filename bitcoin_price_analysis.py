@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 import yfinance as yf
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
 from datetime import datetime, timedelta
+from io import BytesIO
 
 # Set Streamlit page config
 st.set_page_config(
@@ -57,83 +61,187 @@ COINS = [
     {"name": "Optimism", "cg_id": "optimism", "yf_ticker": "OP-USD", "symbol": "OP"},
 ]
 
-COIN_NAME_TO_META = {c["name"]: c for c in COINS}
+# Flat lookup tables built once at import; the UI only ever needs one field per coin
+COIN_NAMES = tuple(c["name"] for c in COINS)
+CG_IDS = {c["name"]: c["cg_id"] for c in COINS}
+YF_TICKERS = {c["name"]: c["yf_ticker"] for c in COINS}
+SYMBOLS = {c["name"]: c["symbol"] for c in COINS}
 
 # ----------------------
 # Data Fetching Functions
 # ----------------------
+# Shared session keeps the CoinGecko TLS connection alive and retries transient failures.
+# The fetch blocks the page, so Retry-After is ignored and read timeouts are not retried.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=2, read=0, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=False,
+)))
+# (connect, read) seconds per attempt
+COINGECKO_TIMEOUT = (3.05, 5)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_all_realtime_prices():
+    """Fetch real-time prices for all listed coins from CoinGecko in one request."""
+    ids = ",".join(CG_IDS.values())
+    url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd"
+    # Failures raise rather than return, so Streamlit does not cache them
+    response = _SESSION.get(url, timeout=COINGECKO_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
 def fetch_realtime_price(coin_cg_id):
-    """Fetch real-time coin price from CoinGecko API."""
-    url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_cg_id}&vs_currencies=usd"
+    """Look up a coin's real-time price from the batched CoinGecko response."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data[coin_cg_id]['usd']
-    except Exception as e:
+        prices = fetch_all_realtime_prices()
+    except (requests.RequestException, ValueError) as e:
         st.error(f"Error fetching real-time price: {e}")
         return None
+    return prices.get(coin_cg_id, {}).get('usd')
+
+# History is refetched once per hour-long bucket; the session memo in main() shares the bucket
+HISTORY_TTL = 3600
 
-def fetch_historical_data(yf_ticker, start_date, end_date):
-    """Fetch historical coin data from Yahoo Finance using yfinance."""
+@st.cache_data(ttl=HISTORY_TTL, show_spinner=False)
+def fetch_historical_data(yf_ticker, start_date, end_date, refresh_bucket=None):
+    """Fetch historical coin data from Yahoo Finance using yfinance; refresh_bucket only varies the cache key."""
     ticker = yf.Ticker(yf_ticker)
     df = ticker.history(start=start_date, end=end_date)
+    # yfinance reports most failures as an empty frame; raising keeps it out of the cache
+    if df.empty:
+        raise ValueError(f"No historical data returned for {yf_ticker}")
     df = df[['Close']]
-    df.index = pd.to_datetime(df.index)
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index)
     return df
 
 # ----------------------
 # Data Processing Functions
 # ----------------------
+def rolling_mean(csum, window):
+    """Trailing mean from a cumulative sum array; NaN until the window is full."""
+    out = np.full(csum.shape, np.nan)
+    if len(csum) >= window:
+        out[window - 1] = csum[window - 1]
+        out[window:] = csum[window:] - csum[:-window]
+        out[window - 1:] /= window
+    return out
+
 def calculate_moving_averages(df, windows=[20, 50]):
     """Add moving averages to DataFrame."""
+    close = df['Close'].to_numpy(dtype=np.float64)
+    # The running sum would carry a gap forward; let pandas handle that case
+    has_gaps = np.isnan(close).any()
+    # One pass over Close serves every window
+    csum = None if has_gaps else np.cumsum(close)
     for window in windows:
-        df[f"MA_{window}"] = df['Close'].rolling(window=window).mean()
+        if has_gaps:
+            df[f"MA_{window}"] = df['Close'].rolling(window=window).mean()
+        else:
+            df[f"MA_{window}"] = rolling_mean(csum, window)
     return df
 
 def calculate_daily_returns(df):
     """Calculate daily returns."""
-    df['Daily Return'] = df['Close'].pct_change()
+    close = df['Close'].to_numpy(dtype=np.float64)
+    returns = np.empty_like(close)
+    returns[:1] = np.nan
+    np.divide(close[1:], close[:-1], out=returns[1:])
+    returns[1:] -= 1.0
+    df['Daily Return'] = returns
     return df
 
 # ----------------------
 # Plotting Functions
 # ----------------------
+# Line charts are thinned to roughly this many points
+MAX_PLOT_POINTS = 1000
+
+def downsample_for_plot(df, columns):
+    """Return dates and float32 arrays for columns, keeping each bucket's min and max of the first column."""
+    n = len(df)
+    if n <= MAX_PLOT_POINTS:
+        idx = np.arange(n)
+    else:
+        # Two points per bucket, so extremes such as the all-time high are never dropped
+        bucket = -(-2 * n // MAX_PLOT_POINTS)
+        full = n - n % bucket
+        key = df[columns[0]].to_numpy(dtype=np.float64)
+        blocks = key[:full].reshape(-1, bucket)
+        offsets = np.arange(0, full, bucket)
+        lows = offsets + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+        highs = offsets + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+        idx = np.unique(np.concatenate([[0], lows, highs, np.arange(full, n), [n - 1]]))
+    return df.index[idx], [df[col].to_numpy(dtype=np.float32)[idx] for col in columns]
+
+def gaussian_kde_curve(values, points=200):
+    """Evaluate a Gaussian KDE (Scott's bandwidth) on an evenly spaced grid over values."""
+    grid = np.linspace(values.min(), values.max(), points)
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    z = (grid[:, None] - values[None, :]) / bandwidth
+    density = np.exp(-0.5 * z ** 2).sum(axis=1) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+def figure_to_png(fig):
+    """Render a figure to PNG bytes at the resolution st.pyplot would use."""
+    buf = BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+    return buf.getvalue()
+
+# Charts are cached as rendered PNG bytes per (data, coin), so a rerun skips both
+# building and drawing, and sessions share an immutable value rather than a Figure.
+@st.cache_data(max_entries=64, show_spinner=False)
 def plot_closing_price(df, coin_name):
-    """Plot historical closing prices."""
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(df.index, df['Close'], label='Close', color='#1f77b4')
+    """Plot historical closing prices as PNG bytes."""
+    dates, (close,) = downsample_for_plot(df, ['Close'])
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(dates, close, label='Close', color='#1f77b4')
     ax.set_title(f'{coin_name} Closing Price', fontsize=16)
     ax.set_xlabel('Date')
     ax.set_ylabel('Price (USD)')
     ax.legend()
-    plt.tight_layout()
-    return fig
+    fig.tight_layout()
+    return figure_to_png(fig)
 
+@st.cache_data(max_entries=64, show_spinner=False)
 def plot_moving_averages(df, coin_name):
-    """Plot closing price with moving averages."""
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(df.index, df['Close'], label='Close', color='#1f77b4', linewidth=1.5)
-    if 'MA_20' in df.columns:
-        ax.plot(df.index, df['MA_20'], label='20-day MA', color='#ff7f0e', linewidth=1)
-    if 'MA_50' in df.columns:
-        ax.plot(df.index, df['MA_50'], label='50-day MA', color='#2ca02c', linewidth=1)
+    """Plot closing price with moving averages as PNG bytes."""
+    columns = ['Close'] + [col for col in ('MA_20', 'MA_50') if col in df.columns]
+    dates, arrays = downsample_for_plot(df, columns)
+    series = dict(zip(columns, arrays))
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(dates, series['Close'], label='Close', color='#1f77b4', linewidth=1.5)
+    if 'MA_20' in series:
+        ax.plot(dates, series['MA_20'], label='20-day MA', color='#ff7f0e', linewidth=1)
+    if 'MA_50' in series:
+        ax.plot(dates, series['MA_50'], label='50-day MA', color='#2ca02c', linewidth=1)
     ax.set_title(f'{coin_name} Price with Moving Averages', fontsize=16)
     ax.set_xlabel('Date')
     ax.set_ylabel('Price (USD)')
     ax.legend()
-    plt.tight_layout()
-    return fig
+    fig.tight_layout()
+    return figure_to_png(fig)
 
+@st.cache_data(max_entries=64, show_spinner=False)
 def plot_daily_returns_hist(df, coin_name):
-    """Plot histogram of daily returns."""
-    fig, ax = plt.subplots(figsize=(8, 4))
-    sns.histplot(df['Daily Return'].dropna(), bins=50, kde=True, color='#1f77b4', ax=ax)
+    """Plot histogram of daily returns as PNG bytes."""
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    returns = df['Daily Return'].to_numpy(dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    if len(returns):
+        counts, edges = np.histogram(returns, bins=50)
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='#1f77b4', alpha=0.75, edgecolor='white')
+        if len(returns) > 1 and returns.std() > 0:
+            grid, density = gaussian_kde_curve(returns)
+            # Scale the density to counts so it overlays the bars
+            ax.plot(grid, density * len(returns) * (edges[1] - edges[0]), color='#1f77b4')
     ax.set_title(f'Histogram of {coin_name} Daily Returns', fontsize=16)
     ax.set_xlabel('Daily Return')
     ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    return fig
+    fig.tight_layout()
+    return figure_to_png(fig)
 
 # ----------------------
 # Streamlit UI
@@ -145,8 +253,7 @@ def main():
     st.sidebar.markdown("""
     Analyze price trends, moving averages, and daily returns for your favorite cryptocurrencies with real-time and historical data.
     """)
-    coin_name = st.sidebar.selectbox("Select Coin", [c["name"] for c in COINS], index=0)
-    coin_meta = COIN_NAME_TO_META[coin_name]
+    coin_name = st.sidebar.selectbox("Select Coin", COIN_NAMES, index=0)
     min_date = datetime(2020, 1, 1)
     max_date = datetime.today()
     default_start = min_date
@@ -159,13 +266,24 @@ def main():
 
     # Fetch data
     with st.spinner('Fetching data...'):
-        df = fetch_historical_data(coin_meta["yf_ticker"], start_date, end_date + timedelta(days=1))
-        df = calculate_moving_averages(df)
-        df = calculate_daily_returns(df)
-        realtime_price = fetch_realtime_price(coin_meta["cg_id"])
+        # Reruns for the same selection reuse the processed frame and skip all numeric work
+        refresh_bucket = int(time.time() // HISTORY_TTL)
+        data_key = (coin_name, start_date, end_date, refresh_bucket)
+        if st.session_state.get('_df_key') != data_key:
+            try:
+                df = fetch_historical_data(YF_TICKERS[coin_name], start_date, end_date + timedelta(days=1), refresh_bucket)
+            except ValueError:
+                st.warning("No data available for the selected range.")
+                return
+            df = calculate_moving_averages(df)
+            df = calculate_daily_returns(df)
+            st.session_state['_df'] = df
+            st.session_state['_df_key'] = data_key
+        df = st.session_state['_df']
+        realtime_price = fetch_realtime_price(CG_IDS[coin_name])
 
     # Main page
-    st.title(f"{coin_meta['symbol']} {coin_name} Price Dashboard")
+    st.title(f"{SYMBOLS[coin_name]} {coin_name} Price Dashboard")
     st.markdown("""
     <style>
     .metric-label { font-size: 1.2em; }
@@ -185,24 +303,30 @@ def main():
 
     # Plots
     st.subheader("Historical Closing Price")
-    st.pyplot(plot_closing_price(df, coin_name))
+    st.image(plot_closing_price(df, coin_name), width="stretch")
 
     st.subheader("Price with Moving Averages (20, 50 days)")
-    st.pyplot(plot_moving_averages(df, coin_name))
+    st.image(plot_moving_averages(df, coin_name), width="stretch")
 
     st.subheader("Histogram of Daily Returns")
-    st.pyplot(plot_daily_returns_hist(df, coin_name))
+    st.image(plot_daily_returns_hist(df, coin_name), width="stretch")
 
     # Data Table
     st.subheader("Data Table (Last 10 Days)")
-    st.dataframe(df.tail(10).style.format({"Close": "${:,.2f}", "MA_20": "${:,.2f}", "MA_50": "${:,.2f}", "Daily Return": "{:.2%}"}))
+    st.dataframe(df.tail(10), column_config={
+        "Close": st.column_config.NumberColumn(format="dollar"),
+        "MA_20": st.column_config.NumberColumn(format="dollar"),
+        "MA_50": st.column_config.NumberColumn(format="dollar"),
+        # A step of 0.0001 pins the percent preset to two decimals, e.g. 3.50%
+        "Daily Return": st.column_config.NumberColumn(format="percent", step=0.0001),
+    })
 
     # Analysis
     st.subheader("Quick Analysis")
     if not df.empty:
-        last_close = df['Close'].iloc[-1]
-        ma20 = df['MA_20'].iloc[-1]
-        ma50 = df['MA_50'].iloc[-1]
+        last_close = df['Close'].to_numpy()[-1]
+        ma20 = df['MA_20'].to_numpy()[-1]
+        ma50 = df['MA_50'].to_numpy()[-1]
         st.markdown(f"- **Last Close:** ${last_close:,.2f}")
         st.markdown(f"- **20-day MA:** ${ma20:,.2f}")
         st.markdown(f"- **50-day MA:** ${ma50:,.2f}")